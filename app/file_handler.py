@@ -4,20 +4,138 @@ File handling for uploads and downloads
 import asyncio
 import logging
 import os
+import re
 import shutil
-import uuid
+import subprocess
+import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import AsyncIterator, Optional, Tuple
 
 import magic
+import xxhash
 from PIL import Image
-import aiofiles
 
 from config.config import settings
 
 logger = logging.getLogger(__name__)
 
+# libjpeg-turbo re-encodes JPEGs several times faster than Pillow's bundled
+# libjpeg; fall back to Pillow when the shared library isn't available
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+    _turbojpeg = TurboJPEG()
+except Exception:
+    _turbojpeg = None
+
+# Optional jpegli encoder - squeezes another ~15-20% out of large JPEGs
+# at the same visual quality when the binary is on PATH
+_cjpegli = shutil.which("cjpegli")
+
+# Known magic-byte prefixes for the common upload types. Checking these in
+# pure Python avoids the libmagic round-trip for the vast majority of files.
+_SIGNATURES = {
+    b'\xff\xd8\xff': 'image',       # JPEG
+    b'\x89PNG': 'image',            # PNG
+    b'GIF8': 'image',               # GIF87a / GIF89a
+    b'%PDF': 'document',            # PDF
+    b'OggS': 'audio',               # OGG (voice notes)
+    b'\x1aE\xdf\xa3': 'video',      # Matroska / WebM
+}
+
+# Extension per message type for temp filenames
+_EXTENSIONS = {
+    'image': '.jpg',
+    'audio': '.ogg',
+    'video': '.mp4',
+    'document': '.pdf',
+    'file': '.bin',
+}
+
+_TIMESTAMP_FMT = "%Y%m%d_%H%M%S"
+
+# Matches the timestamp in temp filenames ({session}_{ts}_{rand}{ext})
+_NAME_TIMESTAMP_RE = re.compile(r'_(\d{8}_\d{6})_[0-9a-f]{8}\.\w+$')
+
+def _name_timestamp(name: str) -> Optional[float]:
+    """Creation time embedded in a temp filename, or None"""
+    m = _NAME_TIMESTAMP_RE.search(name)
+    if not m:
+        return None
+    try:
+        return time.mktime(time.strptime(m.group(1), _TIMESTAMP_FMT))
+    except ValueError:
+        return None
+
+# Single compiled alternation replaces the chain of startswith checks on
+# the libmagic fallback path
+_MIME_RE = re.compile(
+    r'^(?:(image|audio|video)/'
+    r'|application/(?:pdf|msword'
+    r'|vnd\.openxmlformats-officedocument\.wordprocessingml\.document)$)'
+)
+
+# Most recently seen upload digests kept for dedup
+_DEDUP_MAX_ENTRIES = 1024
+
+# SOF markers other than SOF2 (progressive) and the non-frame markers
+# that may legally appear before a frame header
+_SOF_MARKERS = frozenset(
+    (0xC0, 0xC1, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF)
+)
+
+def _is_progressive_jpeg(path: str) -> bool:
+    """Walk the marker segments until the frame header and test for SOF2
+
+    Scanning raw bytes for FF C2 false-positives on EXIF payloads and
+    misses real SOF2 markers pushed past the APPn segments, so the
+    segment lengths have to be honored.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(2) != b'\xff\xd8':  # not a JPEG (no SOI)
+                return False
+            while True:
+                byte = f.read(1)
+                if not byte or byte != b'\xff':
+                    return False
+                # Skip fill bytes before the marker code
+                code = 0xFF
+                while code == 0xFF:
+                    byte = f.read(1)
+                    if not byte:
+                        return False
+                    code = byte[0]
+                if code == 0xC2:  # SOF2: progressive DCT
+                    return True
+                if code in _SOF_MARKERS or code in (0xD9, 0xDA):
+                    return False  # baseline/other frame, EOI, or scan data
+                length = f.read(2)
+                if len(length) < 2:
+                    return False
+                seg_len = (length[0] << 8) | length[1]
+                if seg_len < 2:
+                    return False
+                f.seek(seg_len - 2, 1)
+    except OSError:
+        return False
+
+def _write_and_drop_cache(path: str, data: bytes):
+    """Write bytes and advise the kernel not to keep them in page cache
+
+    Temp uploads are read back once (to forward to Telegram) and then
+    deleted, so caching their pages only evicts hotter data.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+        if hasattr(os, 'posix_fadvise'):
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
 class FileHandler:
     """Handles file operations for the chat system"""
     
@@ -27,114 +145,210 @@ class FileHandler:
         
         # Initialize magic for file type detection
         self.magic = magic.Magic(mime=True)
+
+        # content digest -> existing temp path, LRU-bounded
+        self._dedup: OrderedDict = OrderedDict()
     
-    async def detect_file_type(self, file_data: bytes) -> str:
+    def detect_file_type(self, file_data: bytes) -> str:
         """Detect file type from binary data"""
+        # Fast path: check well-known magic bytes before touching libmagic
+        head = file_data[:16]
+        for sig, file_type in _SIGNATURES.items():
+            if head.startswith(sig):
+                return file_type
+
+        # MP4 stores its 'ftyp' marker after a 4-byte box size
+        if head[4:8] == b'ftyp':
+            return 'video'
+
         try:
-            mime_type = self.magic.from_buffer(file_data[:1024])  # Check first 1KB
-            
+            mime_type = self.magic.from_buffer(file_data[:512])  # 512 bytes is enough for libmagic
+
             # Map MIME types to our message types
-            if mime_type.startswith('image/'):
-                return 'image'
-            elif mime_type.startswith('audio/'):
-                return 'audio'
-            elif mime_type.startswith('video/'):
-                return 'video'
-            elif mime_type in ['application/pdf', 'application/msword', 
-                              'application/vnd.openxmlformats-officedocument.wordprocessingml.document']:
-                return 'document'
-            else:
-                return 'file'
-                
+            m = _MIME_RE.match(mime_type)
+            if m:
+                return m.group(1) or 'document'
+            return 'file'
+
         except Exception as e:
             logger.error(f"Error detecting file type: {e}")
             return 'file'
     
     async def save_temp_file(self, file_data: bytes, session_id: str, file_type: str) -> str:
         """Save file to temporary storage and return path"""
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{session_id}_{timestamp}_{uuid.uuid4().hex[:8]}"
-        
-        # Add appropriate extension based on file type
-        extensions = {
-            'image': '.jpg',
-            'audio': '.ogg',
-            'video': '.mp4',
-            'document': '.pdf',
-            'file': '.bin'
-        }
-        
-        ext = extensions.get(file_type, '.bin')
-        filepath = self.temp_dir / f"{filename}{ext}"
-        
-        # Save file
-        async with aiofiles.open(filepath, 'wb') as f:
-            await f.write(file_data)
-        
+        # Generate unique filename; 4 random bytes give the same 8 hex
+        # chars as the old uuid4 slice at a fraction of the cost
+        timestamp = time.strftime(_TIMESTAMP_FMT)
+        rand = os.urandom(4).hex()
+        ext = _EXTENSIONS.get(file_type, '.bin')
+        filepath = self.temp_dir / f"{session_id}_{timestamp}_{rand}{ext}"
+
+        # Identical payloads (memes, logos) get hardlinked to the copy
+        # already on disk instead of being written again
+        digest = xxhash.xxh3_64_hexdigest(file_data)
+        existing = self._dedup.get(digest)
+        if existing and os.path.exists(existing):
+            try:
+                os.link(existing, filepath)
+                self._dedup.move_to_end(digest)
+                logger.info(f"Deduplicated upload: {filepath} -> {existing}")
+                return str(filepath)
+            except OSError:
+                pass  # cross-device or unlinked original; fall through to write
+
+        # Save file with a single thread hop (open + write + close in one go)
+        await asyncio.to_thread(_write_and_drop_cache, str(filepath), file_data)
+
+        self._dedup[digest] = str(filepath)
+        if len(self._dedup) > _DEDUP_MAX_ENTRIES:
+            self._dedup.popitem(last=False)
+
         logger.info(f"Saved temp file: {filepath} ({len(file_data)} bytes)")
         return str(filepath)
+
+    async def save_temp_file_stream(self, chunks: AsyncIterator[bytes],
+                                    session_id: str, file_type: str) -> str:
+        """Save a chunked upload to temporary storage and return path
+
+        Keeps only one chunk resident instead of the whole file, so peak
+        memory per upload is bounded regardless of file size.
+        """
+        timestamp = time.strftime(_TIMESTAMP_FMT)
+        rand = os.urandom(4).hex()
+        ext = _EXTENSIONS.get(file_type, '.bin')
+        filepath = self.temp_dir / f"{session_id}_{timestamp}_{rand}{ext}"
+
+        total = 0
+        f = await asyncio.to_thread(open, filepath, 'wb', buffering=1 << 20)
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(f.write, chunk)
+                total += len(chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+
+        logger.info(f"Saved temp file: {filepath} ({total} bytes, streamed)")
+        return str(filepath)
     
     async def compress_image(self, image_path: str, max_size_kb: int = 1024) -> Optional[str]:
         """Compress image to reduce size"""
         try:
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Calculate compression quality
-                original_size = os.path.getsize(image_path) / 1024
-                if original_size <= max_size_kb:
-                    return image_path
-                
-                # Calculate target quality
-                quality = int((max_size_kb / original_size) * 85)
-                quality = max(30, min(quality, 95))
-                
-                # Create compressed version
-                compressed_path = image_path.replace('.jpg', '_compressed.jpg')
-                img.save(compressed_path, 'JPEG', quality=quality, optimize=True)
-                
-                # Replace original if significantly smaller
-                compressed_size = os.path.getsize(compressed_path) / 1024
-                if compressed_size < original_size * 0.8:  # At least 20% smaller
-                    os.replace(compressed_path, image_path)
-                    logger.info(f"Compressed image: {original_size:.1f}KB -> {compressed_size:.1f}KB")
-                else:
-                    os.remove(compressed_path)
-                
+            # Calculate compression quality
+            original_size = os.path.getsize(image_path) / 1024
+            if original_size <= max_size_kb:
+                return image_path
+
+            # Already-progressive JPEGs (SOF2 frame header) have optimized
+            # Huffman tables; re-encoding them barely shrinks the file, so
+            # skip unless the image is far over budget
+            if original_size < max_size_kb * 2 and _is_progressive_jpeg(image_path):
                 return image_path
-                
+
+            # Calculate target quality
+            quality = int((max_size_kb / original_size) * 85)
+            quality = max(30, min(quality, 95))
+
+            # Re-encode on a worker thread so the event loop isn't blocked
+            compressed_path = image_path.replace('.jpg', '_compressed.jpg')
+            await asyncio.to_thread(self._recompress_jpeg, image_path, compressed_path, quality)
+
+            # Replace original if significantly smaller
+            compressed_size = os.path.getsize(compressed_path) / 1024
+            if compressed_size < original_size * 0.8:  # At least 20% smaller
+                os.replace(compressed_path, image_path)
+                logger.info(f"Compressed image: {original_size:.1f}KB -> {compressed_size:.1f}KB")
+            else:
+                os.remove(compressed_path)
+
+            return image_path
+
         except Exception as e:
             logger.error(f"Error compressing image {image_path}: {e}")
             return image_path
+
+    def _recompress_jpeg(self, image_path: str, compressed_path: str, quality: int):
+        """Re-encode an image, preferring libjpeg-turbo's SIMD paths"""
+        if _turbojpeg is not None:
+            try:
+                with open(image_path, 'rb') as f:
+                    raw = f.read()
+                pixels = _turbojpeg.decode(raw)
+                encoded = _turbojpeg.encode(pixels, quality=quality, jpeg_subsample=TJSAMP_420)
+                with open(compressed_path, 'wb') as f:
+                    f.write(encoded)
+                self._try_cjpegli(image_path, compressed_path, quality)
+                return
+            except Exception as e:
+                # Non-JPEG payload or decode failure - let Pillow handle it
+                logger.debug(f"TurboJPEG failed for {image_path}, using Pillow: {e}")
+
+        with Image.open(image_path) as img:
+            # Convert to RGB if necessary
+            if img.mode in ('RGBA', 'P'):
+                img = img.convert('RGB')
+            # Progressive Huffman tables + 4:2:0 subsampling shrink output
+            # 10-20% at the same quality setting
+            img.save(compressed_path, 'JPEG', quality=quality,
+                     optimize=True, progressive=True, subsampling=2)
+        self._try_cjpegli(image_path, compressed_path, quality)
+
+    def _try_cjpegli(self, image_path: str, compressed_path: str, quality: int):
+        """Run the optional jpegli encoder and keep its output when smaller"""
+        if _cjpegli is None:
+            return
+        candidate = compressed_path + '.jli'
+        try:
+            result = subprocess.run(
+                [_cjpegli, '-q', str(quality), image_path, candidate],
+                capture_output=True, timeout=30
+            )
+            if result.returncode == 0 and os.path.getsize(candidate) < os.path.getsize(compressed_path):
+                os.replace(candidate, compressed_path)
+            elif os.path.exists(candidate):
+                os.remove(candidate)
+        except Exception as e:
+            logger.debug(f"cjpegli failed for {image_path}: {e}")
+            if os.path.exists(candidate):
+                os.remove(candidate)
     
     async def cleanup_old_files(self, max_age_hours: int = 24):
         """Cleanup old temporary files"""
         try:
             cutoff_time = datetime.now().timestamp() - (max_age_hours * 3600)
-            
-            for filepath in self.temp_dir.glob('*'):
-                if filepath.is_file():
-                    file_age = filepath.stat().st_mtime
-                    
-                    if file_age < cutoff_time:
-                        try:
-                            os.remove(filepath)
-                            logger.debug(f"Cleaned up old file: {filepath.name}")
-                        except Exception as e:
-                            logger.error(f"Error removing file {filepath}: {e}")
-            
+            removed = await asyncio.to_thread(self._remove_files_older_than, cutoff_time)
+            if removed:
+                logger.debug(f"Cleaned up {removed} old files")
+
         except Exception as e:
             logger.error(f"Error in file cleanup: {e}")
+
+    def _remove_files_older_than(self, cutoff_time: float) -> int:
+        """Scan the temp dir once and unlink stale files (runs on a worker thread)"""
+        # DirEntry caches stat results and uses d_type for is_file, so this
+        # is one readdir plus one stat per file instead of three stats
+        removed = 0
+        with os.scandir(self.temp_dir) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file():
+                        continue
+                    # Dedup'd uploads are hardlinks sharing the original's
+                    # inode mtime, so age by the per-name timestamp and
+                    # only fall back to mtime for foreign filenames
+                    created = _name_timestamp(entry.name)
+                    if created is None:
+                        created = entry.stat().st_mtime
+                    if created < cutoff_time:
+                        os.unlink(entry.path)
+                        removed += 1
+                except OSError as e:
+                    logger.error(f"Error removing file {entry.path}: {e}")
+        return removed
     
     def get_file_info(self, filepath: str) -> Optional[dict]:
         """Get information about a file"""
-        if not os.path.exists(filepath):
-            return None
-        
         try:
+            # One stat covers both the existence check and the metadata
             stat = os.stat(filepath)
             return {
                 'path': filepath,
@@ -143,6 +357,8 @@ class FileHandler:
                 'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
                 'extension': Path(filepath).suffix.lower()
             }
+        except FileNotFoundError:
+            return None
         except Exception as e:
             logger.error(f"Error getting file info for {filepath}: {e}")
             return None
@@ -150,8 +366,7 @@ class FileHandler:
     async def read_file(self, filepath: str) -> Optional[bytes]:
         """Read file as bytes"""
         try:
-            async with aiofiles.open(filepath, 'rb') as f:
-                return await f.read()
+            return await asyncio.to_thread(Path(filepath).read_bytes)
         except Exception as e:
             logger.error(f"Error reading file {filepath}: {e}")
             return None
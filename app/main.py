@@ -6,7 +6,8 @@ import logging
 from contextlib import asynccontextmanager
 from typing import Dict, Any
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+import orjson
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
@@ -17,6 +18,14 @@ from app.telegram_bot import TelegramBot
 from app.session_manager import SessionManager
 from models.message import Message, MessageType
 
+# Drive both the WebSocket manager and the Telegram bot on uvloop; the
+# policy has to be set before uvicorn (or anything else) creates the loop
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:  # uvloop is Linux/macOS only
+    pass
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO if settings.DEBUG else logging.WARNING,
@@ -24,6 +33,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Origins are immutable per process; split once instead of per handshake
+_ALLOWED_ORIGINS = frozenset(o.strip() for o in settings.ALLOWED_ORIGINS.split(","))
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (handles datetime/numpy natively)"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY)
+
 # Global instances
 websocket_manager = None
 telegram_bot = None
@@ -64,13 +83,14 @@ app = FastAPI(
     description="Real-time communication between website visitors and Telegram admins",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
 if settings.ENABLE_CORS:
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=settings.ALLOWED_ORIGINS.split(","),
+        allow_origins=list(_ALLOWED_ORIGINS),
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
@@ -95,7 +115,7 @@ async def health_check():
         "sessions": len(session_manager.sessions) if session_manager else 0,
         "uptime": session_manager.get_uptime() if session_manager else 0,
     }
-    return JSONResponse(content=status)
+    return status
 
 @app.get("/stats")
 async def get_stats():
@@ -103,8 +123,7 @@ async def get_stats():
     if not session_manager:
         raise HTTPException(status_code=503, detail="Service unavailable")
     
-    stats = session_manager.get_statistics()
-    return JSONResponse(content=stats)
+    return session_manager.get_statistics()
 
 @app.get("/sessions")
 async def get_active_sessions():
@@ -112,8 +131,7 @@ async def get_active_sessions():
     if not session_manager:
         raise HTTPException(status_code=503, detail="Service unavailable")
     
-    sessions = session_manager.get_active_sessions()
-    return JSONResponse(content=sessions)
+    return session_manager.get_active_sessions()
 
 @app.post("/message")
 async def send_message(message: Message):
@@ -139,17 +157,39 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     
     # Validate origin
     origin = websocket.headers.get("origin")
-    if origin not in settings.ALLOWED_ORIGINS.split(",") and not settings.DEBUG:
+    if origin not in _ALLOWED_ORIGINS and not settings.DEBUG:
         await websocket.close(code=1008, reason="Origin not allowed")
         return
     
     await websocket_manager.handle_connection(websocket, session_id)
 
 @app.post("/upload")
-async def upload_file():
+async def upload_file(session_id: str, file: UploadFile = File(...)):
     """Handle file uploads (fallback for non-WebSocket clients)"""
-    # Implementation for file upload handling
-    return {"status": "File upload endpoint"}
+    if not websocket_manager:
+        raise HTTPException(status_code=503, detail="Service unavailable")
+
+    # Validate session
+    if not session_manager.validate_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    # Sniff the type from the first chunk, then stream the rest to disk
+    # without ever holding the whole file in memory
+    handler = websocket_manager.file_handler
+    first_chunk = await file.read(65536)
+    file_type = handler.detect_file_type(first_chunk)
+
+    async def _chunks():
+        if first_chunk:
+            yield first_chunk
+        while True:
+            chunk = await file.read(65536)
+            if not chunk:
+                break
+            yield chunk
+
+    file_path = await handler.save_temp_file_stream(_chunks(), session_id, file_type)
+    return {"status": "saved", "file_type": file_type, "file_path": file_path}
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -158,4 +198,6 @@ if __name__ == "__main__":
         port=settings.PORT,
         reload=settings.DEBUG,
         log_level="info" if settings.DEBUG else "warning",
+        loop="uvloop",
+        http="httptools",
     )
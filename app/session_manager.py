@@ -3,12 +3,13 @@ Session management for visitor connections
 """
 import asyncio
 import logging
+import time
 import psutil
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
-from collections import defaultdict
+from dataclasses import dataclass
 
 from config.config import settings
 
@@ -18,8 +19,9 @@ logger = logging.getLogger(__name__)
 class Session:
     """Visitor session data"""
     session_id: str
-    created_at: datetime
-    last_activity: datetime
+    created_ts: float       # monotonic, for TTL comparisons
+    last_activity_ts: float  # monotonic
+    created_at_iso: str     # wall clock, for JSON output
     data: Dict[str, Any]
     message_count: int = 0
     is_active: bool = True
@@ -28,22 +30,39 @@ class SessionManager:
     """Manages visitor sessions"""
     
     def __init__(self):
-        self.sessions: Dict[str, Session] = {}
+        # Ordered least-recently-active first: activity updates move a
+        # session to the end, so cleanup only ever pops from the front
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
         self.start_time = datetime.now()
-        self.daily_stats = defaultdict(int)
-        
+        self.daily_stats = {'sessions_created': 0, 'messages': 0, 'sessions_ended': 0}
+        self._current_day = int(time.time() // 86400)
+        self._timeout_seconds = float(settings.SESSION_TIMEOUT)
+
+        # Reuse one psutil handle and refresh memory stats at most every 5s;
+        # health checks poll frequently and each read hits /proc
+        self._process = psutil.Process()
+        self._mem_cache = (0.0, 0.0)  # (monotonic ts, MB)
+
+        # JSON views of sessions, rebuilt only for entries touched since
+        # the last /sessions request
+        self._json_cache: Dict[str, Dict[str, Any]] = {}
+        self._json_dirty: set = set()
+
     def create_session(self, session_id: str, initial_data: Dict[str, Any] = None) -> Session:
         """Create a new visitor session"""
-        now = datetime.now()
+        now = time.monotonic()
         session = Session(
             session_id=session_id,
-            created_at=now,
-            last_activity=now,
+            created_ts=now,
+            last_activity_ts=now,
+            created_at_iso=datetime.now().isoformat(),
             data=initial_data or {},
             message_count=0,
             is_active=True
         )
         self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        self._json_dirty.add(session_id)
         self.daily_stats['sessions_created'] += 1
         logger.info(f"Created session: {session_id}")
         return session
@@ -54,56 +73,80 @@ class SessionManager:
     
     def update_session_activity(self, session_id: str):
         """Update session last activity time"""
-        if session_id in self.sessions:
-            self.sessions[session_id].last_activity = datetime.now()
-            self.sessions[session_id].is_active = True
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.last_activity_ts = time.monotonic()
+            session.is_active = True
+            self.sessions.move_to_end(session_id)
+            self._json_dirty.add(session_id)
     
     def increment_message_count(self, session_id: str):
         """Increment message count for session"""
         if session_id in self.sessions:
             self.sessions[session_id].message_count += 1
+            self._json_dirty.add(session_id)
             self.daily_stats['messages'] += 1
     
     def end_session(self, session_id: str):
         """Mark session as ended"""
         if session_id in self.sessions:
             self.sessions[session_id].is_active = False
+            # Ended sessions go to the front so the next cleanup pops them
+            self.sessions.move_to_end(session_id, last=False)
+            self._json_dirty.add(session_id)
             self.daily_stats['sessions_ended'] += 1
             logger.info(f"Ended session: {session_id}")
-    
+
     def validate_session(self, session_id: str) -> bool:
         """Validate if session exists and is active"""
-        if session_id not in self.sessions:
+        session = self.sessions.get(session_id)
+        if session is None:
             return False
-        
-        session = self.sessions[session_id]
-        
+
         # Check if session timed out
-        timeout = timedelta(seconds=settings.SESSION_TIMEOUT)
-        if datetime.now() - session.last_activity > timeout:
+        if time.monotonic() - session.last_activity_ts > self._timeout_seconds:
             session.is_active = False
             return False
-        
+
         return session.is_active
-    
+
     def get_active_sessions(self) -> List[Dict[str, Any]]:
         """Get list of active sessions"""
+        # Read the clock once per pass, not per session
+        now = time.monotonic()
+        cutoff = now - self._timeout_seconds
+
         active = []
-        now = datetime.now()
-        timeout = timedelta(seconds=settings.SESSION_TIMEOUT)
-        
         for session_id, session in self.sessions.items():
             # Check if session is still active
-            if now - session.last_activity > timeout:
+            if session.last_activity_ts < cutoff:
                 session.is_active = False
                 continue
-            
-            if session.is_active:
-                session_data = asdict(session)
-                session_data['duration'] = str(now - session.created_at)
-                session_data['inactive_for'] = str(now - session.last_activity)
-                active.append(session_data)
-        
+            if not session.is_active:
+                continue
+
+            cached = self._json_cache.get(session_id)
+            if cached is None or session_id in self._json_dirty:
+                cached = {
+                    'session_id': session.session_id,
+                    'created_ts': session.created_ts,
+                    'last_activity_ts': session.last_activity_ts,
+                    'created_at_iso': session.created_at_iso,
+                    'data': session.data,
+                    'message_count': session.message_count,
+                    'is_active': session.is_active,
+                }
+                self._json_cache[session_id] = cached
+                self._json_dirty.discard(session_id)
+
+            # The duration strings change every call, so merge them into a
+            # shallow copy of the cached view
+            active.append({
+                **cached,
+                'duration': str(timedelta(seconds=int(now - cached['created_ts']))),
+                'inactive_for': str(timedelta(seconds=int(now - cached['last_activity_ts']))),
+            })
+
         return active
     
     def get_session_duration(self, session_id: str) -> str:
@@ -113,12 +156,12 @@ class SessionManager:
         
         session = self.sessions[session_id]
         if session.is_active:
-            duration = datetime.now() - session.created_at
+            end_ts = time.monotonic()
         else:
-            duration = session.last_activity - session.created_at
-        
+            end_ts = session.last_activity_ts
+
         # Format duration
-        total_seconds = int(duration.total_seconds())
+        total_seconds = int(end_ts - session.created_ts)
         hours = total_seconds // 3600
         minutes = (total_seconds % 3600) // 60
         seconds = total_seconds % 60
@@ -145,24 +188,27 @@ class SessionManager:
     async def _perform_cleanup(self):
         """Perform actual session cleanup"""
         now = datetime.now()
-        timeout = timedelta(seconds=settings.SESSION_TIMEOUT)
+
+        # Sessions sit in least-recently-active order, so expired and
+        # explicitly ended entries are all at the front: pop until the
+        # first live one
+        cutoff = time.monotonic() - self._timeout_seconds
+
         removed_count = 0
-        
-        # Find sessions to remove
-        to_remove = []
-        for session_id, session in self.sessions.items():
-            # Remove if inactive for timeout period
-            if not session.is_active or (now - session.last_activity > timeout):
-                to_remove.append(session_id)
-        
-        # Remove sessions
-        for session_id in to_remove:
-            del self.sessions[session_id]
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.is_active and session.last_activity_ts >= cutoff:
+                break
+            self.sessions.popitem(last=False)
+            self._json_cache.pop(session_id, None)
+            self._json_dirty.discard(session_id)
             removed_count += 1
-        
-        # Reset daily stats if new day
-        if now.date() != self.start_time.date():
-            self.daily_stats.clear()
+
+        # Reset daily stats if new day (integer compare, no date objects)
+        today = int(time.time() // 86400)
+        if today != self._current_day:
+            self.daily_stats = dict.fromkeys(self.daily_stats, 0)
+            self._current_day = today
             self.start_time = now
         
         if removed_count > 0:
@@ -170,16 +216,18 @@ class SessionManager:
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get server statistics"""
-        active_sessions = len([s for s in self.sessions.values() if s.is_active])
-        
+        active_sessions = sum(1 for s in self.sessions.values() if s.is_active)
+
         # Calculate uptime
         uptime = datetime.now() - self.start_time
         uptime_str = str(uptime).split('.')[0]  # Remove microseconds
-        
-        # Get memory usage
-        process = psutil.Process()
-        memory_usage = process.memory_info().rss / 1024 / 1024  # MB
-        
+
+        # Get memory usage (cached between refreshes)
+        now = time.monotonic()
+        if now - self._mem_cache[0] > 5.0:
+            self._mem_cache = (now, self._process.memory_info().rss / 1024 / 1024)
+        memory_usage = self._mem_cache[1]
+
         return {
             'active_sessions': active_sessions,
             'total_sessions': len(self.sessions),
@@ -193,4 +241,6 @@ class SessionManager:
     async def cleanup(self):
         """Cleanup all sessions on shutdown"""
         self.sessions.clear()
+        self._json_cache.clear()
+        self._json_dirty.clear()
         logger.info("All sessions cleaned up")
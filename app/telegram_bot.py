@@ -3,10 +3,11 @@ Telegram bot handler for admin communication
 """
 import asyncio
 import logging
-import uuid
+from secrets import token_hex
 from datetime import datetime
 from typing import Optional, Dict, List
 
+from cachetools import LRUCache
 from telegram import Update, Bot, Message as TelegramMessage
 from telegram.ext import (
     Application,
@@ -26,6 +27,31 @@ from app.file_handler import FileHandler
 
 logger = logging.getLogger(__name__)
 
+# Pre-built Markdown templates for the group-forwarding hot path; .format
+# is cheaper than rebuilding the multi-line f-strings per message
+TEXT_TEMPLATE = (
+    "👤 *Visitor Message*\n\n"
+    "`{content}`\n\n"
+    "*Session:* `{sid}...`\n"
+    "*Time:* {ts}"
+)
+VOICE_TEMPLATE = (
+    "🎤 *Visitor Voice Message*\n\n"
+    "*Session:* `{sid}...`\n"
+    "*Time:* {ts}"
+)
+IMAGE_TEMPLATE = (
+    "🖼️ *Visitor Image*\n\n"
+    "*Session:* `{sid}...`\n"
+    "*Time:* {ts}"
+)
+FILE_TEMPLATE = (
+    "📎 *Visitor File*\n\n"
+    "`{content}`\n\n"
+    "*Session:* `{sid}...`\n"
+    "*Time:* {ts}"
+)
+
 class TelegramBot:
     """Handles Telegram bot communication with admin group"""
     
@@ -36,8 +62,14 @@ class TelegramBot:
         self.application: Optional[Application] = None
         self.is_running = False
         
-        # Store message mapping for replies
-        self.message_map: Dict[int, str] = {}  # telegram_message_id -> session_id
+        # Store message mapping for replies; LRU-bounded so long-running
+        # deployments don't leak one entry per message forever
+        self.message_map: "LRUCache[int, str]" = LRUCache(maxsize=settings.MSG_MAP_MAX)
+        
+        # Parsed once; every dispatched message compares against it.
+        # Tolerate the unset default so the web app still boots (and
+        # serves HTTP/WS) when Telegram isn't configured in dev
+        self._group_id = int(settings.TELEGRAM_GROUP_ID or 0)
         
     async def start(self):
         """Start the Telegram bot"""
@@ -51,7 +83,17 @@ class TelegramBot:
             # Start polling
             await self.application.initialize()
             await self.application.start()
-            await self.application.updater.start_polling()
+            # timeout=50 keeps each getUpdates open for up to 50s, cutting
+            # empty HTTP round-trips ~10x versus the default short poll
+            await self.application.updater.start_polling(
+                poll_interval=0.0,
+                timeout=50,
+                bootstrap_retries=-1,
+                # The bot only registers message handlers; asking Telegram
+                # for just "message" skips edited/chat-member/etc updates
+                # before they're even sent
+                allowed_updates=["message"],
+            )
             
             self.is_running = True
             logger.info("Telegram bot started successfully")
@@ -77,45 +119,35 @@ class TelegramBot:
         self.application.add_handler(CommandHandler("stats", self._stats_command))
         self.application.add_handler(CommandHandler("broadcast", self._broadcast_command))
         
-        # Message handlers
+        # One message handler; _dispatch_message routes on the message
+        # type itself instead of walking five separate filter chains
         self.application.add_handler(
             MessageHandler(
-                filters.TEXT & ~filters.COMMAND,
-                self._handle_text_message
-            )
-        )
-        
-        # Voice message handler
-        self.application.add_handler(
-            MessageHandler(
-                filters.VOICE,
-                self._handle_voice_message
-            )
-        )
-        
-        # Photo handler
-        self.application.add_handler(
-            MessageHandler(
-                filters.PHOTO,
-                self._handle_photo_message
+                filters.ALL & ~filters.COMMAND,
+                self._dispatch_message
             )
         )
+    
+    async def _dispatch_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Route a group message to the matching handler"""
+        msg = update.message
+        if msg is None:
+            return
         
-        # Document handler
-        self.application.add_handler(
-            MessageHandler(
-                filters.DOCUMENT,
-                self._handle_document_message
-            )
-        )
+        # Check the admin group once here instead of in every handler
+        if update.effective_chat.id != self._group_id:
+            return
         
-        # Reply handler (for replying to visitor messages)
-        self.application.add_handler(
-            MessageHandler(
-                filters.REPLY,
-                self._handle_reply_message
-            )
-        )
+        if msg.voice:
+            await self._handle_voice_message(update, context)
+        elif msg.photo:
+            await self._handle_photo_message(update, context)
+        elif msg.document:
+            await self._handle_document_message(update, context)
+        elif msg.reply_to_message:
+            await self._handle_reply_message(update, context)
+        elif msg.text:
+            await self._handle_text_message(update, context)
     
     async def _start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
@@ -152,20 +184,20 @@ class TelegramBot:
             await update.message.reply_text("No active visitor sessions.")
             return
         
-        response = "👥 *Active Visitor Sessions:*\n\n"
+        parts = ["👥 *Active Visitor Sessions:*\n\n"]
         for session in sessions[:10]:  # Limit to 10
             duration = self.session_manager.get_session_duration(session["session_id"])
-            response += f"• Session: `{session['session_id'][:8]}...`\n"
-            response += f"  Duration: {duration}\n"
-            response += f"  Messages: {session.get('message_count', 0)}\n"
+            parts.append(f"• Session: `{session['session_id'][:8]}...`\n")
+            parts.append(f"  Duration: {duration}\n")
+            parts.append(f"  Messages: {session.get('message_count', 0)}\n")
             if session.get('user_agent'):
-                response += f"  Browser: {session['user_agent'][:30]}...\n"
-            response += "\n"
+                parts.append(f"  Browser: {session['user_agent'][:30]}...\n")
+            parts.append("\n")
         
         if len(sessions) > 10:
-            response += f"... and {len(sessions) - 10} more sessions"
+            parts.append(f"... and {len(sessions) - 10} more sessions")
         
-        await update.message.reply_text(response, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text("".join(parts), parse_mode=ParseMode.MARKDOWN)
     
     async def _stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /stats command - show statistics"""
@@ -195,7 +227,7 @@ class TelegramBot:
         
         # Create broadcast message
         broadcast_msg = Message(
-            id=str(uuid.uuid4()),
+            id=token_hex(16),
             session_id="broadcast",
             content=f"📢 Admin Broadcast: {message_text}",
             message_type=MessageType.ADMIN,
@@ -215,16 +247,12 @@ class TelegramBot:
     
     async def _handle_text_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle regular text messages (not replies)"""
-        # Check if message is in admin group
-        if update.effective_chat.id != int(settings.TELEGRAM_GROUP_ID):
-            return
-        
         # This is a new message (not a reply), treat as general admin message
         message_text = update.message.text
         
         # Create message for all visitors
         broadcast_msg = Message(
-            id=str(uuid.uuid4()),
+            id=token_hex(16),
             session_id="admin_broadcast",
             content=f"💬 Admin: {message_text}",
             message_type=MessageType.ADMIN,
@@ -258,7 +286,7 @@ class TelegramBot:
         
         # Create response message
         response_msg = Message(
-            id=str(uuid.uuid4()),
+            id=token_hex(16),
             session_id=session_id,
             content=update.message.text or "📎 File/Media message",
             message_type=MessageType.ADMIN,
@@ -279,15 +307,10 @@ class TelegramBot:
         # Log the reply
         logger.info(f"Admin reply to {session_id}: {update.message.text[:50]}...")
     
-    async def _handle_voice_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle voice messages from admin"""
-        voice = update.message.voice
-        
-        # Download voice file
-        voice_file = await voice.get_file()
-        voice_data = await voice_file.download_as_bytearray()
-        
-        # Store mapping for replies
+    async def _handle_media(self, update: Update, msg_type: MessageType,
+                            content: str, extra_meta: Dict):
+        """Shared path for admin voice/photo/document messages"""
+        # Determine session
         if update.message.reply_to_message:
             replied_id = update.message.reply_to_message.message_id
             session_id = self.message_map.get(replied_id, "broadcast")
@@ -297,101 +320,72 @@ class TelegramBot:
         self.message_map[update.message.message_id] = session_id
         
         # Create message
-        voice_msg = Message(
-            id=str(uuid.uuid4()),
+        metadata = {
+            "from_admin": update.effective_user.username or "Admin",
+            "telegram_message_id": update.message.message_id,
+        }
+        metadata.update(extra_meta)
+        media_msg = Message(
+            id=token_hex(16),
             session_id=session_id,
-            content="🎤 Voice message from admin",
-            message_type=MessageType.VOICE,
+            content=content,
+            message_type=msg_type,
             timestamp=datetime.now().isoformat(),
-            metadata={
-                "from_admin": update.effective_user.username or "Admin",
-                "voice_duration": voice.duration,
-                "file_size": len(voice_data),
-                "telegram_message_id": update.message.message_id
-            }
+            metadata=metadata,
         )
         
         # Send to visitor(s)
         if session_id == "broadcast":
-            await self.websocket_manager.broadcast(voice_msg)
+            await self.websocket_manager.broadcast(media_msg)
         else:
-            await self.websocket_manager.send_to_client(session_id, voice_msg)
+            await self.websocket_manager.send_to_client(session_id, media_msg)
+    
+    async def _handle_voice_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle voice messages from admin"""
+        voice = update.message.voice
+        
+        # Only metadata is forwarded; Telegram already knows the size, so
+        # there is no need to pull the bytes into memory here
+        await self._handle_media(
+            update,
+            MessageType.VOICE,
+            "\N{MICROPHONE} Voice message from admin",
+            {
+                "voice_duration": voice.duration,
+                "file_size": voice.file_size,
+                "telegram_file_id": voice.file_id,
+            },
+        )
     
     async def _handle_photo_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle photo messages from admin"""
         photo = update.message.photo[-1]  # Get highest resolution
         
-        # Download photo
-        photo_file = await photo.get_file()
-        photo_data = await photo_file.download_as_bytearray()
-        
-        # Determine session
-        if update.message.reply_to_message:
-            replied_id = update.message.reply_to_message.message_id
-            session_id = self.message_map.get(replied_id, "broadcast")
-        else:
-            session_id = "broadcast"
-        
-        self.message_map[update.message.message_id] = session_id
-        
-        # Create message
-        photo_msg = Message(
-            id=str(uuid.uuid4()),
-            session_id=session_id,
-            content="🖼️ Photo from admin",
-            message_type=MessageType.IMAGE,
-            timestamp=datetime.now().isoformat(),
-            metadata={
-                "from_admin": update.effective_user.username or "Admin",
-                "file_size": len(photo_data),
-                "telegram_message_id": update.message.message_id
-            }
+        await self._handle_media(
+            update,
+            MessageType.IMAGE,
+            "\N{FRAME WITH PICTURE}\N{VARIATION SELECTOR-16} Photo from admin",
+            {
+                "file_size": photo.file_size,
+                "telegram_file_id": photo.file_id,
+            },
         )
-        
-        # Send to visitor(s)
-        if session_id == "broadcast":
-            await self.websocket_manager.broadcast(photo_msg)
-        else:
-            await self.websocket_manager.send_to_client(session_id, photo_msg)
     
     async def _handle_document_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle document/file messages from admin"""
         document = update.message.document
         
-        # Download document
-        doc_file = await document.get_file()
-        doc_data = await doc_file.download_as_bytearray()
-        
-        # Determine session
-        if update.message.reply_to_message:
-            replied_id = update.message.reply_to_message.message_id
-            session_id = self.message_map.get(replied_id, "broadcast")
-        else:
-            session_id = "broadcast"
-        
-        self.message_map[update.message.message_id] = session_id
-        
-        # Create message
-        doc_msg = Message(
-            id=str(uuid.uuid4()),
-            session_id=session_id,
-            content=f"📎 {document.file_name} from admin",
-            message_type=MessageType.FILE,
-            timestamp=datetime.now().isoformat(),
-            metadata={
-                "from_admin": update.effective_user.username or "Admin",
+        await self._handle_media(
+            update,
+            MessageType.FILE,
+            f"\N{PAPERCLIP} {document.file_name} from admin",
+            {
                 "file_name": document.file_name,
                 "file_size": document.file_size,
                 "mime_type": document.mime_type,
-                "telegram_message_id": update.message.message_id
-            }
+                "telegram_file_id": document.file_id,
+            },
         )
-        
-        # Send to visitor(s)
-        if session_id == "broadcast":
-            await self.websocket_manager.broadcast(doc_msg)
-        else:
-            await self.websocket_manager.send_to_client(session_id, doc_msg)
     
     async def send_to_telegram_group(self, message: Message):
         """Send visitor message to Telegram group"""
@@ -402,76 +396,35 @@ class TelegramBot:
         try:
             bot = self.application.bot
             
-            # Format message based on type
+            # Format message based on type; all branches share the same
+            # send-and-map tail, so pick the template and send once
             if message.message_type == MessageType.TEXT:
-                formatted_msg = (
-                    f"👤 *Visitor Message*\n\n"
-                    f"`{message.content}`\n\n"
-                    f"*Session:* `{message.session_id[:8]}...`\n"
-                    f"*Time:* {message.timestamp}"
-                )
-                
-                sent_message = await bot.send_message(
-                    chat_id=settings.TELEGRAM_GROUP_ID,
-                    text=formatted_msg,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                
-                # Store mapping for replies
-                self.message_map[sent_message.message_id] = message.session_id
-                return sent_message.message_id
-                
+                template = TEXT_TEMPLATE
             elif message.message_type == MessageType.VOICE:
                 # For voice, we would send the actual voice file
                 # This requires the file path in metadata
-                formatted_msg = (
-                    f"🎤 *Visitor Voice Message*\n\n"
-                    f"*Session:* `{message.session_id[:8]}...`\n"
-                    f"*Time:* {message.timestamp}"
-                )
-                
-                sent_message = await bot.send_message(
-                    chat_id=settings.TELEGRAM_GROUP_ID,
-                    text=formatted_msg,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                
-                self.message_map[sent_message.message_id] = message.session_id
-                return sent_message.message_id
-                
+                template = VOICE_TEMPLATE
             elif message.message_type == MessageType.IMAGE:
-                formatted_msg = (
-                    f"🖼️ *Visitor Image*\n\n"
-                    f"*Session:* `{message.session_id[:8]}...`\n"
-                    f"*Time:* {message.timestamp}"
-                )
-                
-                sent_message = await bot.send_message(
-                    chat_id=settings.TELEGRAM_GROUP_ID,
-                    text=formatted_msg,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                
-                self.message_map[sent_message.message_id] = message.session_id
-                return sent_message.message_id
-                
+                template = IMAGE_TEMPLATE
             else:
-                formatted_msg = (
-                    f"📎 *Visitor File*\n\n"
-                    f"`{message.content}`\n\n"
-                    f"*Session:* `{message.session_id[:8]}...`\n"
-                    f"*Time:* {message.timestamp}"
-                )
-                
-                sent_message = await bot.send_message(
-                    chat_id=settings.TELEGRAM_GROUP_ID,
-                    text=formatted_msg,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                
-                self.message_map[sent_message.message_id] = message.session_id
-                return sent_message.message_id
-                
+                template = FILE_TEMPLATE
+
+            formatted_msg = template.format(
+                content=message.content,
+                sid=message.session_id[:8],
+                ts=message.timestamp,
+            )
+
+            sent_message = await bot.send_message(
+                chat_id=self._group_id,
+                text=formatted_msg,
+                parse_mode=ParseMode.MARKDOWN
+            )
+
+            # Store mapping for replies
+            self.message_map[sent_message.message_id] = message.session_id
+            return sent_message.message_id
+
         except Exception as e:
             logger.error(f"Failed to send message to Telegram: {e}")
             return None
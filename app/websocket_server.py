@@ -2,24 +2,43 @@
 WebSocket server implementation for real-time communication
 """
 import asyncio
-import json
 import logging
-import uuid
+import socket
+import time
+from secrets import token_hex
 from datetime import datetime
+from enum import Enum
 from typing import Dict, Set, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
+import orjson
 import websockets
 from websockets.exceptions import ConnectionClosed
 from websockets.server import WebSocketServerProtocol
 
-from config.config import settings
+from config.config import SEND_TIMEOUT, settings
 from models.message import Message, MessageType
 from app.session_manager import SessionManager
 from app.file_handler import FileHandler
 
 logger = logging.getLogger(__name__)
 
+# Cap how many sends are queued per loop turn so a large broadcast can't
+# starve HTTP handshakes and Telegram polling
+BROADCAST_BATCH_SIZE = 50
+
+# Frames with more payload than this are encoded in a worker thread so a
+# big base64 file envelope can't stall the event loop
+ENCODE_INLINE_LIMIT = 4096
+
+def _default(obj):
+    """orjson fallback for the enum/datetime fields in Message"""
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj)}")
+
 @dataclass
 class ClientConnection:
     """Represents a connected WebSocket client"""
@@ -29,6 +48,9 @@ class ClientConnection:
     last_activity: datetime
     user_agent: str = ""
     ip_address: str = ""
+    # monotonic time of the last update_session_activity call, so chatty
+    # clients don't touch the session store on every single frame
+    last_persisted_at: float = 0.0
 
 class WebSocketManager:
     """Manages WebSocket connections and message routing"""
@@ -50,6 +72,7 @@ class WebSocketManager:
                 ping_interval=settings.WS_PING_INTERVAL,
                 ping_timeout=settings.WS_PING_TIMEOUT,
                 max_size=settings.WS_MAX_SIZE,
+                compression="deflate" if settings.WS_COMPRESSION == "deflate" else None,
             )
             self.is_running = True
             logger.info(f"WebSocket server started on ws://{settings.HOST}:{settings.PORT}")
@@ -70,19 +93,34 @@ class WebSocketManager:
         session_id = path.strip("/")
         if not session_id or session_id == "ws":
             # Generate new session ID
-            session_id = str(uuid.uuid4())
+            session_id = token_hex(16)
         
-        # Get client info
-        headers = dict(websocket.request_headers)
+        # Disable Nagle so small chat frames go out immediately, and apply
+        # any configured buffer sizes for file-heavy workloads
+        try:
+            sock = websocket.transport.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if settings.WS_SNDBUF:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, settings.WS_SNDBUF)
+                if settings.WS_RCVBUF:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, settings.WS_RCVBUF)
+        except (OSError, AttributeError):
+            pass  # platform without the option or non-TCP transport
+
+        # Get client info; Headers supports .get() directly, no need to
+        # materialize the whole mapping for two keys
+        headers = websocket.request_headers
         user_agent = headers.get("User-Agent", "")
         ip_address = headers.get("X-Forwarded-For", websocket.remote_address[0])
         
-        # Create connection record
+        # Create connection record; one clock read covers both fields
+        now = datetime.now()
         connection = ClientConnection(
             websocket=websocket,
             session_id=session_id,
-            connected_at=datetime.now(),
-            last_activity=datetime.now(),
+            connected_at=now,
+            last_activity=now,
             user_agent=user_agent,
             ip_address=ip_address,
         )
@@ -100,11 +138,11 @@ class WebSocketManager:
         try:
             # Send welcome message with session ID
             welcome_msg = Message(
-                id=str(uuid.uuid4()),
+                id=token_hex(16),
                 session_id=session_id,
                 content="Connected to chat server",
                 message_type=MessageType.SYSTEM,
-                timestamp=datetime.now().isoformat(),
+                timestamp=now.isoformat(),
             )
             await self.send_to_client(session_id, welcome_msg)
             
@@ -121,8 +159,19 @@ class WebSocketManager:
             # Cleanup
             await self._cleanup_connection(session_id)
     
+    def _touch_session(self, session_id: str):
+        """Record session activity, debounced to at most once per second"""
+        connection = self.connections.get(session_id)
+        now = time.monotonic()
+        if connection is not None:
+            if now - connection.last_persisted_at <= 1.0:
+                return
+            connection.last_persisted_at = now
+        self.session_manager.update_session_activity(session_id)
+
     async def _process_client_message(self, session_id: str, message_data):
         """Process incoming message from client"""
+        now = datetime.now().isoformat()
         try:
             # Parse message
             if isinstance(message_data, bytes):
@@ -130,20 +179,22 @@ class WebSocketManager:
                 await self._handle_binary_message(session_id, message_data)
             else:
                 # Handle JSON text messages
-                data = json.loads(message_data)
+                data = orjson.loads(message_data)
                 
-                # Create message object
+                # Create message object; plain chat text dominates, so
+                # skip the enum value lookup for it
+                msg_type = data.get("type", "text")
                 message = Message(
-                    id=str(uuid.uuid4()),
+                    id=token_hex(16),
                     session_id=session_id,
                     content=data.get("content", ""),
-                    message_type=MessageType(data.get("type", "text")),
-                    timestamp=datetime.now().isoformat(),
+                    message_type=MessageType.TEXT if msg_type == "text" else MessageType(msg_type),
+                    timestamp=now,
                     metadata=data.get("metadata", {}),
                 )
                 
-                # Update session activity
-                self.session_manager.update_session_activity(session_id)
+                # Update session activity (debounced)
+                self._touch_session(session_id)
                 
                 # Log message
                 logger.info(f"Message from {session_id}: {message.content[:50]}...")
@@ -151,14 +202,14 @@ class WebSocketManager:
                 # Send to Telegram (this would be implemented with your Telegram bot)
                 await self.send_to_telegram(message)
                 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"Invalid JSON from {session_id}")
             error_msg = Message(
-                id=str(uuid.uuid4()),
+                id=token_hex(16),
                 session_id=session_id,
                 content="Invalid message format",
                 message_type=MessageType.ERROR,
-                timestamp=datetime.now().isoformat(),
+                timestamp=now,
             )
             await self.send_to_client(session_id, error_msg)
         except Exception as e:
@@ -166,9 +217,10 @@ class WebSocketManager:
     
     async def _handle_binary_message(self, session_id: str, binary_data: bytes):
         """Handle binary data (voice notes, images, files)"""
+        now = datetime.now().isoformat()
         try:
             # Process file based on metadata (first few bytes for type detection)
-            file_type = await self.file_handler.detect_file_type(binary_data)
+            file_type = self.file_handler.detect_file_type(binary_data)
             file_path = await self.file_handler.save_temp_file(
                 binary_data, 
                 session_id, 
@@ -177,11 +229,11 @@ class WebSocketManager:
             
             # Create message for file
             message = Message(
-                id=str(uuid.uuid4()),
+                id=token_hex(16),
                 session_id=session_id,
                 content=f"File upload: {file_type}",
                 message_type=MessageType.FILE,
-                timestamp=datetime.now().isoformat(),
+                timestamp=now,
                 metadata={
                     "file_path": file_path,
                     "file_type": file_type,
@@ -189,59 +241,115 @@ class WebSocketManager:
                 },
             )
             
-            # Update session
-            self.session_manager.update_session_activity(session_id)
+            # Update session (debounced)
+            self._touch_session(session_id)
             
             # Send to Telegram
             await self.send_to_telegram(message)
             
             # Notify client
             await self.send_to_client(session_id, Message(
-                id=str(uuid.uuid4()),
+                id=token_hex(16),
                 session_id=session_id,
                 content="File uploaded successfully",
                 message_type=MessageType.SYSTEM,
-                timestamp=datetime.now().isoformat(),
+                timestamp=now,
             ))
             
         except Exception as e:
             logger.error(f"Error handling binary data from {session_id}: {e}")
             await self.send_to_client(session_id, Message(
-                id=str(uuid.uuid4()),
+                id=token_hex(16),
                 session_id=session_id,
                 content="Failed to upload file",
                 message_type=MessageType.ERROR,
-                timestamp=datetime.now().isoformat(),
+                timestamp=now,
             ))
     
+    @staticmethod
+    def _encode(message: Message) -> bytes:
+        """Encode a message to its wire format once"""
+        # to_dict builds a flat dict literal; asdict would deep-copy the
+        # metadata dict and walk it recursively. orjson returns bytes
+        # directly, so the websockets library skips its internal UTF-8
+        # encode as well
+        return orjson.dumps(message.to_dict(), default=_default)
+
+    @staticmethod
+    def _payload_size_hint(message: Message) -> int:
+        """Cheap estimate of the encoded frame size"""
+        size = len(message.content)
+        if message.metadata:
+            for value in message.metadata.values():
+                if isinstance(value, (str, bytes)):
+                    size += len(value)
+        return size
+
     async def send_to_client(self, session_id: str, message: Message):
         """Send message to specific client"""
         if session_id in self.connections:
             try:
                 connection = self.connections[session_id]
-                await connection.websocket.send(json.dumps(asdict(message)))
+                # Inline encode for small chat frames; offload large file
+                # envelopes (base64 blobs in metadata) to a thread
+                if self._payload_size_hint(message) > ENCODE_INLINE_LIMIT:
+                    payload = await asyncio.to_thread(self._encode, message)
+                else:
+                    payload = self._encode(message)
+                await asyncio.wait_for(
+                    connection.websocket.send(payload),
+                    timeout=SEND_TIMEOUT,
+                )
                 return True
+            except asyncio.TimeoutError:
+                logger.warning(f"Send to {session_id} timed out, dropping client")
+                await self._cleanup_connection(session_id)
             except ConnectionClosed:
                 await self._cleanup_connection(session_id)
             except Exception as e:
                 logger.error(f"Error sending to {session_id}: {e}")
         return False
-    
+
     async def broadcast(self, message: Message, exclude_session: Optional[str] = None):
         """Broadcast message to all connected clients"""
+        # Encode once; the payload is identical for every client
+        payload = self._encode(message)
+
+        targets = [
+            (session_id, connection)
+            for session_id, connection in self.connections.items()
+            if session_id != exclude_session
+        ]
+        if not targets:
+            return
+
+        # Queue frames a batch at a time: small deployments finish in one
+        # gather, large ones yield to the loop between batches
         disconnected = []
-        
-        for session_id, connection in self.connections.items():
-            if session_id == exclude_session:
-                continue
-            
-            try:
-                await connection.websocket.send(json.dumps(asdict(message)))
-            except ConnectionClosed:
-                disconnected.append(session_id)
-            except Exception as e:
-                logger.error(f"Error broadcasting to {session_id}: {e}")
-        
+        for start in range(0, len(targets), BROADCAST_BATCH_SIZE):
+            batch = targets[start:start + BROADCAST_BATCH_SIZE]
+            # The timeout keeps one slow client's full send buffer from
+            # stalling the whole batch
+            results = await asyncio.gather(
+                *(
+                    asyncio.wait_for(
+                        connection.websocket.send(payload),
+                        timeout=SEND_TIMEOUT,
+                    )
+                    for _, connection in batch
+                ),
+                return_exceptions=True,
+            )
+
+            for (session_id, _), result in zip(batch, results):
+                if isinstance(result, (ConnectionClosed, asyncio.TimeoutError)):
+                    disconnected.append(session_id)
+                elif isinstance(result, Exception):
+                    logger.error(f"Error broadcasting to {session_id}: {result}")
+
+            if start + BROADCAST_BATCH_SIZE < len(targets):
+                await asyncio.sleep(0)
+
         # Cleanup disconnected clients
         for session_id in disconnected:
             await self._cleanup_connection(session_id)
@@ -2,79 +2,171 @@
 Configuration settings using Pydantic
 """
 import os
-from typing import List, Optional
-from pydantic_settings import BaseSettings
-from dotenv import load_dotenv
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
 
-# Load environment variables
-load_dotenv()
+def _iter_csv(value: str):
+    """Single-pass CSV tokenizer: yields stripped fields via str.find
+    without the intermediate list str.split allocates; empty fields
+    (trailing commas, double commas) are skipped"""
+    start = 0
+    while True:
+        end = value.find(",", start)
+        if end == -1:
+            field = value[start:].strip()
+            if field:
+                yield field
+            return
+        field = value[start:end].strip()
+        if field:
+            yield field
+        start = end + 1
 
-class Settings(BaseSettings):
-    """Application settings"""
-    
-    # Telegram Configuration
-    TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
-    TELEGRAM_GROUP_ID: str = os.getenv("TELEGRAM_GROUP_ID", "")
-    TELEGRAM_ADMIN_IDS: str = os.getenv("TELEGRAM_ADMIN_IDS", "")
-    
-    # Server Configuration
-    PORT: int = int(os.getenv("PORT", 8000))
-    HOST: str = os.getenv("HOST", "0.0.0.0")
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
-    DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
-    
-    # WebSocket Configuration
-    WS_PING_INTERVAL: int = int(os.getenv("WS_PING_INTERVAL", 30))
-    WS_PING_TIMEOUT: int = int(os.getenv("WS_PING_TIMEOUT", 60))
-    WS_MAX_SIZE: int = int(os.getenv("WS_MAX_SIZE", 10485760))  # 10MB
-    
-    # Session Configuration
-    SESSION_TIMEOUT: int = int(os.getenv("SESSION_TIMEOUT", 86400))  # 24 hours
-    MAX_SESSIONS: int = int(os.getenv("MAX_SESSIONS", 1000))
-    CLEANUP_INTERVAL: int = int(os.getenv("CLEANUP_INTERVAL", 300))  # 5 minutes
-    
-    # File Configuration
-    MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", 52428800))  # 50MB
-    TEMP_DIR: str = os.getenv("TEMP_DIR", "./temp")
-    ALLOWED_EXTENSIONS: str = os.getenv(
-        "ALLOWED_EXTENSIONS", 
-        "jpg,jpeg,png,gif,mp3,mp4,ogg,pdf,doc,docx,txt"
-    )
-    
-    # Security
-    ALLOWED_ORIGINS: str = os.getenv("ALLOWED_ORIGINS", "https://yourdomain.com,http://localhost:3000")
-    ENABLE_CORS: bool = os.getenv("ENABLE_CORS", "True").lower() == "true"
-    RATE_LIMIT: int = int(os.getenv("RATE_LIMIT", 100))
-    
-    # Redis Configuration (optional)
-    REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
-    REDIS_ENABLED: bool = os.getenv("REDIS_ENABLED", "False").lower() == "true"
-    
-    # Logging
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-    LOG_FILE: Optional[str] = os.getenv("LOG_FILE")
-    
-    # Monitoring
-    ENABLE_METRICS: bool = os.getenv("ENABLE_METRICS", "True").lower() == "true"
-    METRICS_PORT: int = int(os.getenv("METRICS_PORT", 9090))
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
-    
-    def get_allowed_origins_list(self) -> List[str]:
-        """Get allowed origins as list"""
-        return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
-    
-    def get_allowed_extensions_list(self) -> List[str]:
-        """Get allowed file extensions as list"""
-        return [ext.strip().lower() for ext in self.ALLOWED_EXTENSIONS.split(",")]
-    
-    def get_admin_ids_list(self) -> List[int]:
-        """Get admin IDs as list"""
-        if not self.TELEGRAM_ADMIN_IDS:
-            return []
-        return [int(id_str.strip()) for id_str in self.TELEGRAM_ADMIN_IDS.split(",")]
+@lru_cache(maxsize=1)
+def _settings_class():
+    """Define Settings on first use; importing pydantic-settings pulls in
+    the whole pydantic graph and dominates cold start, so callers that
+    never touch settings (or touch them late) don't pay for it at
+    `import config.config` time."""
+    from pydantic import PrivateAttr
+    from pydantic_settings import BaseSettings
 
-# Global settings instance
-settings = Settings()
+    class Settings(BaseSettings):
+        """Application settings"""
+    
+        # Telegram Configuration
+        TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
+        TELEGRAM_GROUP_ID: str = os.getenv("TELEGRAM_GROUP_ID", "")
+        TELEGRAM_ADMIN_IDS: str = os.getenv("TELEGRAM_ADMIN_IDS", "")
+    
+        # Server Configuration
+        PORT: int = int(os.getenv("PORT", 8000))
+        HOST: str = os.getenv("HOST", "0.0.0.0")
+        SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
+        DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
+    
+        # WebSocket Configuration
+        WS_PING_INTERVAL: int = int(os.getenv("WS_PING_INTERVAL", 30))
+        WS_PING_TIMEOUT: int = int(os.getenv("WS_PING_TIMEOUT", 60))
+        WS_MAX_SIZE: int = int(os.getenv("WS_MAX_SIZE", 10485760))  # 10MB
+        # "none" skips permessage-deflate (small JSON frames aren't worth the
+        # CPU); "deflate" enables it for file-heavy deployments
+        WS_COMPRESSION: str = os.getenv("WS_COMPRESSION", "none")
+        # Max seconds to wait on a single websocket send before the client
+        # is considered too slow and dropped
+        WS_SEND_TIMEOUT: float = float(os.getenv("WS_SEND_TIMEOUT", 10.0))
+        # Socket buffer sizes in bytes; 0 keeps the kernel defaults
+        WS_SNDBUF: int = int(os.getenv("WS_SNDBUF", 0))
+        WS_RCVBUF: int = int(os.getenv("WS_RCVBUF", 0))
+    
+        # Session Configuration
+        SESSION_TIMEOUT: int = int(os.getenv("SESSION_TIMEOUT", 86400))  # 24 hours
+        MAX_SESSIONS: int = int(os.getenv("MAX_SESSIONS", 1000))
+        CLEANUP_INTERVAL: int = int(os.getenv("CLEANUP_INTERVAL", 300))  # 5 minutes
+        # Max telegram-message-id -> session-id mappings kept for replies
+        MSG_MAP_MAX: int = int(os.getenv("MSG_MAP_MAX", 10000))
+    
+        # File Configuration
+        MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", 52428800))  # 50MB
+        TEMP_DIR: str = os.getenv("TEMP_DIR", "./temp")
+        ALLOWED_EXTENSIONS: str = os.getenv(
+            "ALLOWED_EXTENSIONS", 
+            "jpg,jpeg,png,gif,mp3,mp4,ogg,pdf,doc,docx,txt"
+        )
+    
+        # Security
+        ALLOWED_ORIGINS: str = os.getenv("ALLOWED_ORIGINS", "https://yourdomain.com,http://localhost:3000")
+        ENABLE_CORS: bool = os.getenv("ENABLE_CORS", "True").lower() == "true"
+        RATE_LIMIT: int = int(os.getenv("RATE_LIMIT", 100))
+    
+        # Redis Configuration (optional)
+        REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
+        REDIS_ENABLED: bool = os.getenv("REDIS_ENABLED", "False").lower() == "true"
+    
+        # Logging
+        LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+        LOG_FILE: Optional[str] = os.getenv("LOG_FILE")
+    
+        # Monitoring
+        ENABLE_METRICS: bool = os.getenv("ENABLE_METRICS", "True").lower() == "true"
+        METRICS_PORT: int = int(os.getenv("METRICS_PORT", 9090))
+    
+        # Split once at construction; the env strings never change per process
+        _origins: Tuple[str, ...] = PrivateAttr()
+        _extensions: Tuple[str, ...] = PrivateAttr()
+        _admin_ids: Tuple[int, ...] = PrivateAttr()
+        _admin_id_set: FrozenSet[int] = PrivateAttr()
+        _extension_set: FrozenSet[str] = PrivateAttr()
+    
+        class Config:
+            env_file = ".env"
+            case_sensitive = True
+    
+        def model_post_init(self, __context) -> None:
+            self._origins = tuple(_iter_csv(self.ALLOWED_ORIGINS))
+            self._extensions = tuple(
+                ext.lower() for ext in _iter_csv(self.ALLOWED_EXTENSIONS)
+            )
+            self._admin_ids = tuple(
+                int(id_str) for id_str in _iter_csv(self.TELEGRAM_ADMIN_IDS)
+            )
+            self._admin_id_set = frozenset(self._admin_ids)
+            self._extension_set = frozenset(self._extensions)
+    
+        def get_allowed_origins_list(self) -> Tuple[str, ...]:
+            """Get allowed origins, pre-split at construction"""
+            return self._origins
+    
+        def get_allowed_extensions_list(self) -> Tuple[str, ...]:
+            """Get allowed file extensions, pre-split at construction"""
+            return self._extensions
+    
+        def get_admin_ids_list(self) -> Tuple[int, ...]:
+            """Get admin IDs, pre-parsed at construction"""
+            return self._admin_ids
+    
+        @property
+        def admin_ids(self) -> FrozenSet[int]:
+            """Admin IDs as a frozenset for O(1) membership checks"""
+            return self._admin_id_set
+    
+        @property
+        def allowed_extensions_set(self) -> FrozenSet[str]:
+            """Allowed extensions as a frozenset for O(1) membership checks"""
+            return self._extension_set
+
+
+    return Settings
+
+@lru_cache(maxsize=1)
+def get_settings():
+    """Shared Settings instance; one env read and validation per process"""
+    return _settings_class()()
+
+# Hot-path aliases: first access materializes the value into this
+# module's globals, so later reads are plain module attributes instead
+# of pydantic descriptor dispatch per lookup
+_SETTING_ALIASES = {
+    "TOKEN": "TELEGRAM_BOT_TOKEN",
+    "GROUP_ID": "TELEGRAM_GROUP_ID",
+    "RATE_LIMIT": "RATE_LIMIT",
+    "PING_INTERVAL": "WS_PING_INTERVAL",
+    "PING_TIMEOUT": "WS_PING_TIMEOUT",
+    "SEND_TIMEOUT": "WS_SEND_TIMEOUT",
+    "MAX_FILE_SIZE": "MAX_FILE_SIZE",
+    "TEMP_DIR": "TEMP_DIR",
+}
+
+def __getattr__(name):
+    # PEP 562: `from config.config import settings` keeps working, but the
+    # instance (and pydantic itself) only materializes when first accessed
+    if name == "settings":
+        return get_settings()
+    if name == "Settings":
+        return _settings_class()
+    attr = _SETTING_ALIASES.get(name)
+    if attr is not None:
+        value = getattr(get_settings(), attr)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,18 +1,12 @@
 """
 Application constants
 """
+from types import MappingProxyType
 
-# Message Types
-class MessageType:
-    TEXT = "text"
-    VOICE = "voice"
-    IMAGE = "image"
-    FILE = "file"
-    SYSTEM = "system"
-    ADMIN = "admin"
-    ERROR = "error"
-    TYPING = "typing"
-    READ_RECEIPT = "read_receipt"
+# Message Types: the canonical definition is the str Enum in
+# models.message; re-exported here so existing `from config.constants
+# import MessageType` call sites keep working against one type
+from models.message import MessageType
 
 # WebSocket Message Types
 class WSMessageType:
@@ -56,16 +50,19 @@ class SessionStatus:
     EXPIRED = "expired"
     BANNED = "banned"
 
+# Read-only lookup tables; MappingProxyType makes accidental mutation
+# a TypeError and the shared views safe across tasks
+
 # File size limits (in bytes)
-FILE_SIZE_LIMITS = {
+FILE_SIZE_LIMITS = MappingProxyType({
     "image": 10 * 1024 * 1024,  # 10MB
     "voice": 20 * 1024 * 1024,  # 20MB
     "video": 50 * 1024 * 1024,  # 50MB
     "document": 50 * 1024 * 1024,  # 50MB
-}
+})
 
 # MIME type mappings
-MIME_TYPE_MAP = {
+MIME_TYPE_MAP = MappingProxyType({
     "image/jpeg": ".jpg",
     "image/png": ".png",
     "image/gif": ".gif",
@@ -76,19 +73,19 @@ MIME_TYPE_MAP = {
     "application/msword": ".doc",
     "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
     "text/plain": ".txt",
-}
+})
 
 # Default values
-DEFAULT_VALUES = {
+DEFAULT_VALUES = MappingProxyType({
     "SESSION_TIMEOUT": 86400,  # 24 hours
     "MAX_SESSIONS": 1000,
     "RATE_LIMIT": 100,  # messages per minute
     "WEBSOCKET_TIMEOUT": 30,  # seconds
     "RECONNECT_DELAY": 5,  # seconds
-}
+})
 
 # Response messages
-RESPONSE_MESSAGES = {
+RESPONSE_MESSAGES = MappingProxyType({
     "welcome": "👋 Welcome to the chat! An admin will respond shortly.",
     "session_expired": "⚠️ Your session has expired. Please refresh the page.",
     "rate_limited": "⚠️ You're sending messages too fast. Please wait a moment.",
@@ -98,13 +95,21 @@ RESPONSE_MESSAGES = {
     "reconnected": "✅ Reconnected successfully.",
     "admin_online": "💬 Admin is online.",
     "admin_offline": "⏳ Admin is currently offline. Your message will be delivered when they're back.",
-}
+})
 
 # Telegram formatting
-TELEGRAM_FORMATTING = {
+TELEGRAM_FORMATTING = MappingProxyType({
     "bold": "*{}*",
     "italic": "_{}_",
     "code": "`{}`",
     "pre": "```{}```",
     "link": "[{}]({})",
-}
+})
+
+# Pre-bound formatters: one attribute lookup at import instead of a
+# method lookup per formatted string
+BOLD_FMT = TELEGRAM_FORMATTING["bold"].format
+ITALIC_FMT = TELEGRAM_FORMATTING["italic"].format
+CODE_FMT = TELEGRAM_FORMATTING["code"].format
+PRE_FMT = TELEGRAM_FORMATTING["pre"].format
+LINK_FMT = TELEGRAM_FORMATTING["link"].format
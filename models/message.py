@@ -1,12 +1,50 @@
 """
 Message data models
 """
+import itertools
+import os
+import time
 import uuid
 from datetime import datetime
 from enum import Enum
 from typing import Optional, Dict, Any, List
 from dataclasses import dataclass, field
-from pydantic import BaseModel, Field
+import msgspec
+
+# Timestamp defaults are cached on a 10ms tick: bursts of messages share
+# one datetime construction (and one isoformat call) instead of paying
+# for both per instance
+# Bound at module scope: default factories run per message, and a local
+# name skips the datetime/uuid attribute lookup each call
+_now = datetime.now
+_uuid4 = uuid.uuid4
+
+# Default message ids only correlate frames within this process, so a
+# pid-qualified counter beats a urandom read + UUID object per message;
+# callers needing cross-process uniqueness pass an explicit id
+_ID = itertools.count()
+_PID = os.getpid()
+
+def _next_id() -> str:
+    return f"{_PID}-{next(_ID)}"
+
+_TICK_NS = 10_000_000
+_last_dt = (0, datetime.min)
+_last_iso = (0, "")
+
+def _cached_now() -> datetime:
+    global _last_dt
+    tick = time.time_ns() // _TICK_NS
+    if tick != _last_dt[0]:
+        _last_dt = (tick, _now())
+    return _last_dt[1]
+
+def _iso_now() -> str:
+    global _last_iso
+    tick = time.time_ns() // _TICK_NS
+    if tick != _last_iso[0]:
+        _last_iso = (tick, _cached_now().isoformat())
+    return _last_iso[1]
 
 class MessageType(str, Enum):
     """Message type enumeration"""
@@ -28,15 +66,15 @@ class MessageDirection(str, Enum):
     ADMIN_TO_VISITOR = "admin_to_visitor"
     SYSTEM = "system"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Message:
     """Base message model"""
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = field(default_factory=_next_id)
     session_id: str = ""
     content: str = ""
     message_type: MessageType = MessageType.TEXT
     direction: MessageDirection = MessageDirection.VISITOR_TO_ADMIN
-    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    timestamp: str = field(default_factory=_iso_now)
     metadata: Dict[str, Any] = field(default_factory=dict)
     
     def to_dict(self) -> Dict[str, Any]:
@@ -55,95 +93,88 @@ class Message:
     def from_dict(cls, data: Dict[str, Any]) -> 'Message':
         """Create message from dictionary"""
         return cls(
-            id=data.get("id", str(uuid.uuid4())),
+            id=data.get("id") or str(_uuid4()),
             session_id=data["session_id"],
             content=data["content"],
             message_type=MessageType(data["type"]),
             direction=MessageDirection(data.get("direction", "visitor_to_admin")),
-            timestamp=data.get("timestamp", datetime.now().isoformat()),
+            timestamp=data.get("timestamp") or _iso_now(),
             metadata=data.get("metadata", {}),
         )
 
-class TextMessage(BaseModel):
+class TextMessage(msgspec.Struct, tag_field="message_type", tag="text", frozen=True):
     """Text message model"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     session_id: str
     content: str
-    message_type: MessageType = MessageType.TEXT
-    timestamp: datetime = Field(default_factory=datetime.now)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda dt: dt.isoformat(),
-            MessageType: lambda mt: mt.value,
-        }
+    id: str = msgspec.field(default_factory=_next_id)
+    timestamp: datetime = msgspec.field(default_factory=_cached_now)
+    metadata: Dict[str, Any] = msgspec.field(default_factory=dict)
 
-class VoiceMessage(BaseModel):
+class VoiceMessage(msgspec.Struct, tag_field="message_type", tag="voice", frozen=True):
     """Voice message model"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     session_id: str
     audio_data: Optional[bytes] = None
     audio_url: Optional[str] = None
     duration: float = 0.0  # in seconds
-    message_type: MessageType = MessageType.VOICE
-    timestamp: datetime = Field(default_factory=datetime.now)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    id: str = msgspec.field(default_factory=_next_id)
+    timestamp: datetime = msgspec.field(default_factory=_cached_now)
+    metadata: Dict[str, Any] = msgspec.field(default_factory=dict)
 
-class ImageMessage(BaseModel):
+class ImageMessage(msgspec.Struct, tag_field="message_type", tag="image", frozen=True):
     """Image message model"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     session_id: str
     image_data: Optional[bytes] = None
     image_url: Optional[str] = None
     width: Optional[int] = None
     height: Optional[int] = None
     caption: Optional[str] = None
-    message_type: MessageType = MessageType.IMAGE
-    timestamp: datetime = Field(default_factory=datetime.now)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    id: str = msgspec.field(default_factory=_next_id)
+    timestamp: datetime = msgspec.field(default_factory=_cached_now)
+    metadata: Dict[str, Any] = msgspec.field(default_factory=dict)
 
-class FileMessage(BaseModel):
+class FileMessage(msgspec.Struct, tag_field="message_type", tag="file", frozen=True):
     """File message model"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     session_id: str
-    file_data: Optional[bytes] = None
-    file_url: Optional[str] = None
     file_name: str
     file_size: int
     mime_type: str
-    message_type: MessageType = MessageType.FILE
-    timestamp: datetime = Field(default_factory=datetime.now)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    file_data: Optional[bytes] = None
+    file_url: Optional[str] = None
+    id: str = msgspec.field(default_factory=_next_id)
+    timestamp: datetime = msgspec.field(default_factory=_cached_now)
+    metadata: Dict[str, Any] = msgspec.field(default_factory=dict)
 
-class SystemMessage(BaseModel):
+class SystemMessage(msgspec.Struct, tag_field="message_type", tag="system", frozen=True):
     """System message model"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    session_id: str = "system"
     content: str
-    message_type: MessageType = MessageType.SYSTEM
-    timestamp: datetime = Field(default_factory=datetime.now)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    session_id: str = "system"
+    id: str = msgspec.field(default_factory=_next_id)
+    timestamp: datetime = msgspec.field(default_factory=_cached_now)
+    metadata: Dict[str, Any] = msgspec.field(default_factory=dict)
 
-class TypingIndicator(BaseModel):
+class TypingIndicator(msgspec.Struct, tag_field="message_type", tag="typing", frozen=True):
     """Typing indicator model"""
     session_id: str
     is_typing: bool = True
-    message_type: MessageType = MessageType.TYPING
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: datetime = msgspec.field(default_factory=_cached_now)
 
-class ReadReceipt(BaseModel):
+class ReadReceipt(msgspec.Struct, tag_field="message_type", tag="read_receipt", frozen=True):
     """Read receipt model"""
     message_id: str
     session_id: str
-    read_at: datetime = Field(default_factory=datetime.now)
-    message_type: MessageType = MessageType.READ_RECEIPT
+    read_at: datetime = msgspec.field(default_factory=_cached_now)
 
-class MessageBatch(BaseModel):
+class MessageBatch(msgspec.Struct, frozen=True):
     """Batch of messages"""
     messages: List[Message]
-    batch_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    timestamp: datetime = Field(default_factory=datetime.now)
+    batch_id: str = msgspec.field(default_factory=lambda: str(_uuid4()))
+    timestamp: datetime = msgspec.field(default_factory=_cached_now)
 
-# Union type for all message types
+# Union type for all message types; the tag_field doubles as the wire
+# discriminator, so one decoder handles every frame shape
 MessageUnion = TextMessage | VoiceMessage | ImageMessage | FileMessage | SystemMessage | TypingIndicator | ReadReceipt
+
+# Shared codec instances: msgspec encodes straight to bytes usable as a
+# WS frame payload, no Python-level json round-trip
+encode_message = msgspec.json.encode
+decode_message = msgspec.json.Decoder(MessageUnion).decode
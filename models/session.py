@@ -2,10 +2,21 @@
 Session data models
 """
 from datetime import datetime
+
+try:
+    from ciso8601 import parse_datetime as _parse_datetime
+except ImportError:  # pure-Python fallback
+    def _parse_datetime(value: str) -> datetime:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
 from typing import Dict, Any, Optional
 from dataclasses import dataclass, field
 from enum import Enum
 
+# Bound once; the default factories and activity updates run per session
+# event and skip the attribute lookup on each call
+_now = datetime.now
+
 class SessionStatus(str, Enum):
     """Session status enumeration"""
     ACTIVE = "active"
@@ -13,7 +24,7 @@ class SessionStatus(str, Enum):
     EXPIRED = "expired"
     BANNED = "banned"
 
-@dataclass
+@dataclass(slots=True)
 class VisitorInfo:
     """Visitor information"""
     user_agent: str = ""
@@ -22,46 +33,63 @@ class VisitorInfo:
     timezone: str = "UTC"
     referrer: str = ""
     page_url: str = ""
+    # Cached to_dict result; visitor info never changes after connect
+    _as_dict: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert visitor info to dictionary (built once, reused)"""
+        if self._as_dict is None:
+            self._as_dict = {
+                "user_agent": self.user_agent,
+                "ip_address": self.ip_address,
+                "language": self.language,
+                "timezone": self.timezone,
+                "referrer": self.referrer,
+                "page_url": self.page_url,
+            }
+        return self._as_dict
 
-@dataclass
+@dataclass(slots=True)
 class Session:
     """Visitor session"""
     session_id: str
     status: SessionStatus = SessionStatus.ACTIVE
-    created_at: datetime = field(default_factory=datetime.now)
-    last_activity: datetime = field(default_factory=datetime.now)
+    created_at: datetime = field(default_factory=_now)
+    last_activity: datetime = field(default_factory=_now)
     visitor_info: VisitorInfo = field(default_factory=VisitorInfo)
     message_count: int = 0
     file_count: int = 0
     metadata: Dict[str, Any] = field(default_factory=dict)
+    # Lazily formatted ISO strings; sessions serialize far more often
+    # than their timestamps change
+    _created_iso: Optional[str] = field(default=None, repr=False, compare=False)
+    _activity_iso: Optional[str] = field(default=None, repr=False, compare=False)
     
     def update_activity(self):
         """Update last activity timestamp"""
-        self.last_activity = datetime.now()
+        self.last_activity = _now()
+        self._activity_iso = None
     
     def is_active(self, timeout_seconds: int = 86400) -> bool:
         """Check if session is still active"""
         if self.status != SessionStatus.ACTIVE:
             return False
         
-        time_since_activity = (datetime.now() - self.last_activity).total_seconds()
+        time_since_activity = (_now() - self.last_activity).total_seconds()
         return time_since_activity <= timeout_seconds
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert session to dictionary"""
+        if self._created_iso is None:
+            self._created_iso = self.created_at.isoformat()
+        if self._activity_iso is None:
+            self._activity_iso = self.last_activity.isoformat()
         return {
             "session_id": self.session_id,
             "status": self.status.value,
-            "created_at": self.created_at.isoformat(),
-            "last_activity": self.last_activity.isoformat(),
-            "visitor_info": {
-                "user_agent": self.visitor_info.user_agent,
-                "ip_address": self.visitor_info.ip_address,
-                "language": self.visitor_info.language,
-                "timezone": self.visitor_info.timezone,
-                "referrer": self.visitor_info.referrer,
-                "page_url": self.visitor_info.page_url,
-            },
+            "created_at": self._created_iso,
+            "last_activity": self._activity_iso,
+            "visitor_info": self.visitor_info.to_dict(),
             "message_count": self.message_count,
             "file_count": self.file_count,
             "metadata": self.metadata,
@@ -72,9 +100,9 @@ class Session:
         """Create session from dictionary"""
         visitor_info = VisitorInfo(**data.get("visitor_info", {}))
         
-        # Parse datetime strings
-        created_at = datetime.fromisoformat(data["created_at"].replace('Z', '+00:00'))
-        last_activity = datetime.fromisoformat(data["last_activity"].replace('Z', '+00:00'))
+        # Parse datetime strings (ciso8601 handles the Z suffix natively)
+        created_at = _parse_datetime(data["created_at"])
+        last_activity = _parse_datetime(data["last_activity"])
         
         return cls(
             session_id=data["session_id"],
@@ -87,7 +115,7 @@ class Session:
             metadata=data.get("metadata", {}),
         )
 
-@dataclass
+@dataclass(slots=True)
 class SessionStats:
     """Session statistics"""
     total_sessions: int = 0
@@ -1,27 +1,42 @@
 # websocket_bot.py
 import asyncio
-import json
+import base64
 import os
+import weakref
+from io import BytesIO
+
+import orjson
+from typing import Optional
+
 from websockets import serve
 from telegram import Bot, Update
 from telegram.ext import ApplicationBuilder, MessageHandler, filters, ContextTypes
 from config import BOT_TOKEN, GROUP_ID, WS_PORT, TMP_DIR
 
-os.makedirs(TMP_DIR, exist_ok=True)
-bot = Bot(token=BOT_TOKEN)
-VISITORS = {}
+# Constructed in main() once the event loop is running, so the HTTP
+# client pool binds to the right loop and import stays side-effect free
+bot: Optional[Bot] = None
+# Weak values: a connection that dies without a clean close is reaped as
+# soon as its websocket object is collected, no manual bookkeeping
+VISITORS = weakref.WeakValueDictionary()
 
 # Telegram handler
 async def handle_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
-    if msg.chat_id != GROUP_ID:
+    # Voice/document forwards carry the session id in the caption, not
+    # the text
+    origin = msg.reply_to_message.text or msg.reply_to_message.caption or ""
+    # Slice the session id out of "Visitor <session> ..." directly; a
+    # find call and a whitespace split beat spinning up the regex
+    # machinery. split(None, 1) stops at any whitespace - forwarded text
+    # messages put a newline, not a space, after the session id
+    i = origin.find("Visitor ")
+    if i < 0:
         return
-
-    origin = msg.reply_to_message.text if msg.reply_to_message else msg.reply_to_message.caption if msg.reply_to_message else ""
-    if "Visitor" not in origin:
+    head = origin[i + 8:].split(None, 1)  # 8 == len("Visitor ")
+    if not head:
         return
-
-    session = origin.split("Visitor ")[1].split()[0]
+    session = head[0]
     payload = {}
 
     if msg.text:
@@ -35,12 +50,41 @@ async def handle_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     ws = VISITORS.get(session)
     if ws:
-        await ws.send(json.dumps(payload))
+        # orjson returns bytes, which websockets sends without re-encoding
+        await ws.send(orjson.dumps(payload))
+
+def _file_bytes(data):
+    # bytes arrive as-is (binary frame), str decodes as base64 in C; a
+    # JSON list of ints (legacy clients) pays the per-int conversion
+    blob = data["file"]
+    if isinstance(blob, (bytes, bytearray)):
+        return bytes(blob)
+    if isinstance(blob, str):
+        return base64.b64decode(blob)
+    return bytes(blob)
+
+# Visitor message handlers, dispatched by payload type
+async def _visitor_text(session, data):
+    await bot.send_message(chat_id=GROUP_ID, text=f"Visitor {session}\n\n{data['text']}")
+
+async def _visitor_voice(session, data):
+    # Send straight from memory: the old write-then-reopen did two full
+    # passes over the file and leaked the read FD
+    payload = BytesIO(_file_bytes(data))
+    payload.name = f"{session}.ogg"
+    await bot.send_voice(chat_id=GROUP_ID, voice=payload, caption=f"Visitor {session}")
+
+async def _visitor_file(session, data):
+    payload = BytesIO(_file_bytes(data))
+    payload.name = data.get("name", "file")
+    await bot.send_document(chat_id=GROUP_ID, document=payload, caption=f"Visitor {session}")
+
+_HANDLERS = {"text": _visitor_text, "voice": _visitor_voice, "file": _visitor_file}
 
 # WebSocket handler
 async def ws_handler(websocket):
     init = await websocket.recv()
-    init_data = json.loads(init)
+    init_data = orjson.loads(init)
     session = init_data.get("session")
     if not session:
         await websocket.close()
@@ -50,32 +94,40 @@ async def ws_handler(websocket):
     await bot.send_message(chat_id=GROUP_ID, text=f"Visitor {session} connected")
 
     try:
+        pending = None
         async for message in websocket:
-            data = json.loads(message)
-            if data["type"] == "text":
-                await bot.send_message(chat_id=GROUP_ID, text=f"Visitor {session}\n\n{data['text']}")
-            elif data["type"] == "voice":
-                file_path = os.path.join(TMP_DIR, f"{session}.ogg")
-                with open(file_path, "wb") as f:
-                    f.write(bytes(data["file"]))
-                await bot.send_voice(chat_id=GROUP_ID, voice=open(file_path, "rb"), caption=f"Visitor {session}")
-            elif data["type"] == "file":
-                filename = data.get("name", "file")
-                file_path = os.path.join(TMP_DIR, filename)
-                with open(file_path, "wb") as f:
-                    f.write(bytes(data["file"]))
-                await bot.send_document(chat_id=GROUP_ID, document=open(file_path, "rb"), caption=f"Visitor {session}")
+            if isinstance(message, bytes):
+                # Binary frame: the blob for the metadata frame before it
+                if pending is not None:
+                    data, pending = pending, None
+                    data["file"] = message
+                    await _HANDLERS[data["type"]](session, data)
+                continue
+            data = orjson.loads(message)
+            handler = _HANDLERS.get(data["type"])
+            if handler is None:
+                continue
+            if data["type"] != "text" and "file" not in data:
+                # Metadata only; the raw blob follows as a binary frame
+                pending = data
+                continue
+            await handler(session, data)
     except Exception as e:
         print(f"Error session {session}: {e}")
-    finally:
-        if session in VISITORS:
-            del VISITORS[session]
 
 # Main
 async def main():
+    global bot
+    os.makedirs(TMP_DIR, exist_ok=True)
+    bot = Bot(token=BOT_TOKEN)
+
     port = int(os.environ.get("PORT", WS_PORT))
     app = ApplicationBuilder().token(BOT_TOKEN).build()
-    app.add_handler(MessageHandler(filters.ALL & (~filters.User(username=None)), handle_admin))
+    # Chat + REPLY prune everything handle_admin would drop anyway, inside
+    # PTB's dispatcher instead of in the handler; the old
+    # ~filters.User(username=None) matched nothing and made the filter
+    # effectively filters.ALL
+    app.add_handler(MessageHandler(filters.Chat(chat_id=int(GROUP_ID)) & filters.REPLY, handle_admin))
     ws_server = serve(ws_handler, "0.0.0.0", port)
     await asyncio.gather(ws_server, app.run_polling())
 